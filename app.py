@@ -1,12 +1,24 @@
+from __future__ import annotations
+
+import asyncio
 import gradio as gr
 import os
-import json
+import orjson
+import hashlib
+import sqlite3
+import threading
 import time
-import requests
-from typing import List, Dict, Generator
-from openai import OpenAI
+import httpx
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import List, Dict, Mapping, AsyncGenerator, Tuple, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
+# openai and requests are imported where they are first used, so the UI starts without paying for them
+if TYPE_CHECKING:
+    import requests
+    from openai import AsyncOpenAI
+
 # Load environment variables
 load_dotenv()
 
@@ -23,27 +35,6 @@ TEACHER_MODEL_DEFAULT = "llama3.2:latest"
 STUDENT1_MODEL_DEFAULT = "llama3.2:1b"
 STUDENT2_MODEL_DEFAULT = "gemma3:1b"
 
-# Teacher Config
-TEACHER_CONFIG_DEFAULT = {
-    "temperature": 0.7,
-    "top_p": 0.9,
-    "max_tokens": 150,
-}
-
-# Student 1 Config
-STUDENT1_CONFIG_DEFAULT = {
-    "temperature": 0.4,
-    "top_p": 0.85,
-    "max_tokens": 100,
-}
-
-# Student 2 Config
-STUDENT2_CONFIG_DEFAULT = {
-    "temperature": 0.9,
-    "top_p": 0.9,
-    "max_tokens": 100,
-}
-
 # Prompts
 TEACHER_PROMPT_DEFAULT = """You are Professor Maya, a Python programming teacher teaching Curious George and Handson Alex.
 
@@ -70,40 +61,187 @@ You learn by doing. When you see code, you want to try variations or ask what ha
 When Professor Maya shows code, ask questions like "What if I use numbers?" or share what you tried.
 Keep responses brief (2-3 sentences)."""
 
+@dataclass(slots=True, frozen=True)
+class ParticipantSpec:
+    """
+    One seat in the classroom: who speaks, which model answers for them and how it samples.
+    Specs are frozen and their config is read-only because PARTICIPANTS is shared by every
+    browser session; per-run settings are applied with dataclasses.replace instead.
+    """
+    name: str
+    title: str
+    avatar: str
+    source: str
+    model: str
+    prompt: str
+    temperature: float
+    top_p: float
+    max_tokens: int
+    # Derived once per spec rather than on every turn
+    prefix: str = field(init=False)
+    config: Mapping[str, float] = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "prefix", f"**{self.name}** {self.avatar}:\n\n")
+        object.__setattr__(self, "config", MappingProxyType(
+            {"temperature": self.temperature, "top_p": self.top_p, "max_tokens": self.max_tokens}
+        ))
+
+# Default classroom, in speaking order; the UI panels are built from this list
+PARTICIPANTS = [
+    ParticipantSpec(
+        name="Professor Maya", title="Teacher", avatar="👩‍🏫",
+        source="Ollama", model=TEACHER_MODEL_DEFAULT, prompt=TEACHER_PROMPT_DEFAULT,
+        temperature=0.7, top_p=0.9, max_tokens=150,
+    ),
+    ParticipantSpec(
+        name="Curious George", title="Student 1", avatar="🐵",
+        source="Ollama", model=STUDENT1_MODEL_DEFAULT, prompt=STUDENT1_PROMPT_DEFAULT,
+        temperature=0.4, top_p=0.85, max_tokens=100,
+    ),
+    ParticipantSpec(
+        name="Handson Alex", title="Student 2", avatar="🧑‍💻",
+        source="Ollama", model=STUDENT2_MODEL_DEFAULT, prompt=STUDENT2_PROMPT_DEFAULT,
+        temperature=0.9, top_p=0.9, max_tokens=100,
+    ),
+]
+
+# Context window: only the most recent turns are sent verbatim, older ones are folded into
+# a short summary written by the teacher's model. 0 sends the full conversation every turn.
+CONTEXT_WINDOW_DEFAULT = 8
+
+SUMMARY_CONFIG = MappingProxyType({
+    "temperature": 0.3,
+    "top_p": 0.9,
+    "max_tokens": 150,
+})
+
+SUMMARY_PROMPT = """You keep notes for a Python lesson between Professor Maya, Curious George and Handson Alex.
+Summarize the conversation you are given in 2-3 sentences: what has been taught so far, the code examples shown, and any open questions."""
+
+# Response cache: replays identical prompts from disk instead of re-running inference.
+# Off by default because sampling with temperature > 0 is meant to vary between runs.
+RESPONSE_CACHE_DEFAULT = os.getenv("LLM_CACHE", "") == "1"
+RESPONSE_CACHE_PATH = os.path.join(".cache", "llm_responses.db")
+
+# Ollama keeps warmed-up models in memory this long after their last use
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_WARMUP_TIMEOUT = 120 # seconds; loading a large model from disk can be slow
+
+# HTTP connection pool shared by every call to the same provider
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=30.0)
+
 INITIAL_TOPIC_DEFAULT = "Let's start learning Python from the very beginning. Show us the first thing every programmer learns!"
 MAX_TURNS_DEFAULT = 20
+PACING_MS_DEFAULT = 0 # Delay between turns; streaming already paces the output
+STREAM_UPDATE_INTERVAL = 0.05 # seconds; minimum gap between chat updates while tokens stream in
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def get_ollama_models(base_url: str) -> List[str]:
-    """Fetch available models from Ollama"""
+OPENAI_MODELS = ("gpt-4o", "gpt-4o-mini", "o1-preview", "o1-mini", "gpt-3.5-turbo")
+OLLAMA_FALLBACK_MODELS = ("llama3.2:latest", "llama3.2:1b", "gemma:2b")
+
+# Model listings are cached briefly so repeated dropdown refreshes don't hit the server each time
+MODEL_LIST_TTL = 30.0 # seconds
+MODEL_LIST_FAILURE_TTL = 5.0 # seconds; an unreachable server is retried soon, but not by every dropdown at once
+_MODEL_CACHE: Dict[str, Tuple[float, List[str]]] = {} # base URL -> (expires at, models)
+_MODEL_CACHE_LOCK = threading.Lock()
+
+# Shared session so model listings reuse a kept-alive connection instead of opening a new one
+_SESSION: Optional[requests.Session] = None
+
+def get_session() -> requests.Session:
+    """Return the shared requests session, creating it on first use"""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+        session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+        _SESSION = session
+    return _SESSION
+
+def ollama_native_url(base_url: str, endpoint: str) -> str:
+    """Turn the OpenAI-compatible base URL (…/v1) into a native Ollama API URL such as …/api/tags"""
+    api_url = base_url.replace("/v1", f"/api/{endpoint}")
+    if api_url == base_url: # If replacement didn't happen (no /v1), try appending
+         api_url = f"{base_url}/api/{endpoint}"
+    return api_url
+
+def fetch_ollama_models(base_url: str) -> Optional[List[str]]:
+    """Fetch available models from Ollama, or None if the server can't be reached"""
     try:
         # Try the standard Ollama API endpoint first if the user provided the v1 base url
-        api_url = base_url.replace("/v1", "/api/tags")
-        if api_url == base_url: # If replacement didn't happen (no /v1), try appending
-             api_url = f"{base_url}/api/tags"
-             
-        response = requests.get(api_url, timeout=2)
+        api_url = ollama_native_url(base_url, "tags")
+        response = get_session().get(api_url, timeout=2)
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             return [model['name'] for model in data.get('models', [])]
     except:
         pass
         
-    # Fallback to trying to list via OpenAI client if direct API fails
+    # Fallback to the OpenAI-compatible listing if the native API fails
     try:
-        client = OpenAI(base_url=base_url, api_key="ollama")
-        models = client.models.list()
-        return [m.id for m in models]
+        response = get_session().get(f"{base_url.rstrip('/')}/models", timeout=2)
+        response.raise_for_status()
+        return [m['id'] for m in orjson.loads(response.content).get('data', [])]
     except Exception as e:
         print(f"Error fetching Ollama models: {e}")
-        return ["llama3.2:latest", "llama3.2:1b", "gemma:2b"] # Fallbacks
+        return None
+
+def get_ollama_models(base_url: str) -> List[str]:
+    """
+    Return available Ollama models, reusing a recent listing for the same URL.
+    The lock makes the three dropdowns that load at startup share one fetch
+    instead of each waiting on its own request. A failed fetch is remembered
+    too, for a few seconds, so an unreachable server costs one timeout rather
+    than three; a later refresh tries again.
+    """
+    with _MODEL_CACHE_LOCK:
+        cached = _MODEL_CACHE.get(base_url)
+        if cached and time.monotonic() < cached[0]:
+            return list(cached[1])
+
+        models = fetch_ollama_models(base_url)
+        if models is None:
+            _MODEL_CACHE[base_url] = (time.monotonic() + MODEL_LIST_FAILURE_TTL, list(OLLAMA_FALLBACK_MODELS))
+        else:
+            _MODEL_CACHE[base_url] = (time.monotonic() + MODEL_LIST_TTL, models)
+        return list(_MODEL_CACHE[base_url][1])
 
 def get_openai_models() -> List[str]:
     """Return a curated list of OpenAI models"""
-    return ["gpt-4o", "gpt-4o-mini", "o1-preview", "o1-mini", "gpt-3.5-turbo"]
+    return list(OPENAI_MODELS)
+
+def check_ollama_parallelism(parallel_students, student1_source, student2_source, student1_model, student2_model, ollama_url):
+    """
+    Warn when parallel students would be serialized by Ollama.
+    Ollama doesn't report its slot settings, so this explains what to set and
+    shows which models /api/ps says are loaded right now.
+    """
+    if not parallel_students or student1_source != "Ollama" or student2_source != "Ollama":
+        return gr.Markdown(visible=False)
+
+    if student1_model == student2_model:
+        setting = "`OLLAMA_NUM_PARALLEL` of at least 2, because both students share one model"
+    else:
+        setting = "`OLLAMA_MAX_LOADED_MODELS` of at least 3, so the students' models stay loaded side by side"
+    lines = [
+        f"⚠️ **Ollama answers concurrent requests one at a time unless it has enough slots.** "
+        f"Start `ollama serve` with {setting}, e.g. `OLLAMA_NUM_PARALLEL=2 OLLAMA_MAX_LOADED_MODELS=3 ollama serve`."
+    ]
+    try:
+        response = get_session().get(ollama_native_url(ollama_url, "ps"), timeout=2)
+        response.raise_for_status()
+        loaded = [model["name"] for model in orjson.loads(response.content).get("models", [])]
+        lines.append(f"Loaded right now: {', '.join(loaded) if loaded else 'none'}.")
+    except Exception:
+        lines.append(f"Could not reach Ollama at {ollama_url}.")
+    return gr.Markdown("\n\n".join(lines), visible=True)
 
 def update_model_dropdown(source, ollama_url):
     """Update the model dropdown based on the selected source"""
@@ -118,42 +256,244 @@ def update_model_dropdown(source, ollama_url):
     # allow_custom_value=False ensures a standard dropdown which is more robust for scrolling
     return gr.Dropdown(choices=models, value=models[0] if models else None, interactive=True, allow_custom_value=False)
 
+def load_model_dropdowns(teacher_source, student1_source, student2_source, ollama_url):
+    """Populate all three model dropdowns at once on page load"""
+    return (
+        update_model_dropdown(teacher_source, ollama_url),
+        update_model_dropdown(student1_source, ollama_url),
+        update_model_dropdown(student2_source, ollama_url),
+    )
+
+def preload_ollama_model(model: str, ollama_url: str):
+    """Ask Ollama to load a model into memory; a generate call without a prompt only loads it"""
+    response = get_session().post(
+        ollama_native_url(ollama_url, "generate"),
+        json={"model": model, "keep_alive": OLLAMA_KEEP_ALIVE},
+        timeout=(2, OLLAMA_WARMUP_TIMEOUT), # Fail fast if Ollama isn't there; only the load itself may take long
+    )
+    response.raise_for_status()
+
+async def warm_up_models(teacher_source, teacher_model, student1_source, student1_model, student2_source, student2_model, ollama_url):
+    """Load every Ollama model in use concurrently, so no turn waits on a cold model load"""
+    selections = [(teacher_source, teacher_model), (student1_source, student1_model), (student2_source, student2_model)]
+    models = list(dict.fromkeys(model for source, model in selections if source == "Ollama"))
+    if not models:
+        return ""
+
+    results = await asyncio.gather(
+        *(asyncio.to_thread(preload_ollama_model, model, ollama_url) for model in models),
+        return_exceptions=True
+    )
+    ready, failed = [], []
+    for model, result in zip(models, results):
+        if isinstance(result, Exception):
+            print(f"Error warming up {model}: {result}")
+            failed.append(model)
+        else:
+            ready.append(model)
+
+    status = []
+    if ready:
+        status.append(f"🔥 Warmed up: {', '.join(ready)}")
+    if failed:
+        status.append(f"⚠️ Could not warm up: {', '.join(failed)}")
+    return "\n\n".join(status)
+
 # ============================================================================
 # LOGIC
 # ============================================================================
 
-def call_llm(model: str, messages: List[Dict[str, str]], config: Dict, source: str, ollama_url: str, api_key: str) -> str:
-    """Send a message to the appropriate LLM provider"""
-    try:
+# One client per provider endpoint, so TCP/TLS connections are kept alive between turns
+_CLIENTS: Dict[Tuple[str, Optional[str], Optional[str]], AsyncOpenAI] = {}
+
+def get_client(source: str, ollama_url: str, api_key: str) -> AsyncOpenAI:
+    """Return the cached client for a provider, creating it on first use"""
+    if source == "OpenAI API":
+        key = (source, None, api_key)
+    else:
+        key = (source, ollama_url, None)
+
+    client = _CLIENTS.get(key)
+    if client is None:
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        http_client = DefaultAsyncHttpxClient(limits=HTTP_POOL_LIMITS)
         if source == "OpenAI API":
-            client = OpenAI(api_key=api_key) # Uses default OpenAI URL
+            client = AsyncOpenAI(api_key=api_key, http_client=http_client) # Uses default OpenAI URL
         else:
-            client = OpenAI(base_url=ollama_url, api_key="ollama")
-
-        response = client.chat.completions.create(
+            client = AsyncOpenAI(base_url=ollama_url, api_key="ollama", http_client=http_client)
+        _CLIENTS[key] = client
+    return client
+
+async def complete(model: str, messages: List[Dict[str, str]], config: Mapping[str, float], source: str, ollama_url: str, api_key: str, use_cache: bool = False) -> str:
+    """Get a full (non-streamed) completion; provider errors are raised to the caller"""
+    if use_cache:
+        key = response_cache_key(model, messages, config, source, ollama_url)
+        cached = get_cached_response(key)
+        if cached is not None:
+            return cached
+
+    client = get_client(source, ollama_url, api_key)
+    response = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=config.get("temperature", 0.7),
+        top_p=config.get("top_p", 0.9),
+        max_tokens=config.get("max_tokens", 150),
+    )
+    content = response.choices[0].message.content or ""
+
+    if use_cache:
+        store_cached_response(key, content)
+    return content
+
+_CACHE_DB: Optional[sqlite3.Connection] = None
+
+def get_cache_db() -> sqlite3.Connection:
+    """Open (and create if needed) the on-disk response cache"""
+    global _CACHE_DB
+    if _CACHE_DB is None:
+        os.makedirs(os.path.dirname(RESPONSE_CACHE_PATH), exist_ok=True)
+        _CACHE_DB = sqlite3.connect(RESPONSE_CACHE_PATH, check_same_thread=False)
+        _CACHE_DB.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+    return _CACHE_DB
+
+def response_cache_key(model: str, messages: List[Dict[str, str]], config: Mapping[str, float], source: str, ollama_url: str) -> str:
+    """Hash everything that determines a completion into a stable cache key"""
+    endpoint = "openai" if source == "OpenAI API" else ollama_url
+    # default=dict lets orjson serialize the read-only MappingProxyType configs
+    payload = orjson.dumps([endpoint, model, messages, config], option=orjson.OPT_SORT_KEYS, default=dict)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def get_cached_response(key: str) -> Optional[str]:
+    """Look up a previously stored completion"""
+    row = get_cache_db().execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+def store_cached_response(key: str, content: str):
+    """Store a completion so identical prompts can be replayed"""
+    db = get_cache_db()
+    db.execute("INSERT OR REPLACE INTO responses (key, content) VALUES (?, ?)", (key, content))
+    db.commit()
+
+async def stream_llm(model: str, messages: List[Dict[str, str]], config: Mapping[str, float], source: str, ollama_url: str, api_key: str, use_cache: bool = False, prompt_cache_key: Optional[str] = None) -> AsyncGenerator[str, None]:
+    """
+    Stream a response from the appropriate LLM provider, yielding text deltas as they arrive.
+    prompt_cache_key groups requests that share a prompt prefix so OpenAI routes them
+    to the same prompt cache; Ollama reuses the prefix on its own and does not need it.
+    """
+    if use_cache:
+        key = response_cache_key(model, messages, config, source, ollama_url)
+        cached = get_cached_response(key)
+        if cached is not None:
+            yield cached
+            return
+
+    extra = {}
+    if source == "OpenAI API" and prompt_cache_key:
+        extra["prompt_cache_key"] = prompt_cache_key
+
+    parts = []
+    try:
+        client = get_client(source, ollama_url, api_key)
+        stream = await client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=config.get("temperature", 0.7),
             top_p=config.get("top_p", 0.9),
             max_tokens=config.get("max_tokens", 150),
+            stream=True,
+            **extra,
         )
-        return response.choices[0].message.content
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
     except Exception as e:
-        return f"[Error calling {model} via {source}: {e}]"
+        # Errors are shown in the chat but never cached
+        yield f"[Error calling {model} via {source}: {e}]"
+        return
 
-def format_conversation_for_prompt(history: List[Dict[str, str]]) -> str:
-    """Format conversation history as a readable string for the prompt"""
-    if not history:
-        return "No conversation yet."
-    
-    lines = []
-    for entry in history:
-        name = entry.get("name", "Unknown")
-        content = entry.get("content", "")
-        lines.append(f"{name}: {content}")
-    return "\n\n".join(lines)
-
-def run_conversation_step(
+    if use_cache:
+        store_cached_response(key, "".join(parts))
+
+def history_message(viewer: str, entry: Dict[str, str]) -> Dict[str, str]:
+    """Render one past turn from a participant's point of view"""
+    if entry["name"] == viewer:
+        return {"role": "assistant", "content": entry["content"]}
+    return {"role": "user", "content": f"{entry['name']}: {entry['content']}"}
+
+def build_transcript(name: str, prompt: str, history: List[Dict[str, str]], summary: str = "") -> List[Dict[str, str]]:
+    """
+    Build a participant's view of the conversation.
+    The persona goes first, then the summary of older turns (if any), then past
+    turns as role-tagged messages in a stable order (the speaker's own turns as
+    "assistant", everyone else's as "user"). The list is only ever appended to
+    between summaries, so earlier turns stay a byte-identical prefix and servers
+    can reuse their prompt cache instead of re-reading the whole transcript.
+    """
+    transcript = [{"role": "system", "content": prompt}]
+    if summary:
+        transcript.append({"role": "user", "content": f"Summary of the conversation so far: {summary}"})
+    transcript.extend(history_message(name, entry) for entry in history)
+    return transcript
+
+async def summarize_turns(summary: str, entries: List[Dict[str, str]], model: str, source: str, ollama_url: str, api_key: str, use_cache: bool = False) -> Optional[str]:
+    """Fold older turns (and the previous summary) into a new short summary, or None if the call fails"""
+    lines = [f"Summary so far: {summary}"] if summary else []
+    lines.extend(f"{entry['name']}: {entry['content']}" for entry in entries)
+    messages = [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": "\n\n".join(lines)}
+    ]
+    try:
+        return await complete(model, messages, SUMMARY_CONFIG, source, ollama_url, api_key, use_cache)
+    except Exception as e:
+        print(f"Error summarizing conversation: {e}")
+        return None
+
+def instruction_message(name: str, topic: str, opening: bool) -> Dict[str, str]:
+    """The short, per-turn instruction that goes after the transcript"""
+    if opening:
+        content = f"""You are {name}.
+The topic to discuss is: {topic}
+
+Start the conversation by introducing the topic and asking an opening question."""
+    else:
+        content = f"You are {name}. Now respond with what you would like to say next, as {name}. Be natural and conversational."
+    return {"role": "user", "content": content}
+
+async def merge_streams(streams: List[AsyncGenerator[str, None]]) -> AsyncGenerator[Tuple[int, str], None]:
+    """Run several streams concurrently, yielding (stream index, item) as soon as any of them produces"""
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def pump(index, stream):
+        try:
+            async for item in stream:
+                await queue.put((index, item))
+        finally:
+            await queue.put((index, finished))
+
+    tasks = [asyncio.create_task(pump(i, stream)) for i, stream in enumerate(streams)]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            index, item = await queue.get()
+            if item is finished:
+                remaining -= 1
+            else:
+                yield index, item
+        await asyncio.gather(*tasks) # Surface any error raised inside a stream
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def new_session() -> Dict:
+    """Empty conversation state, kept per browser session in a gr.State"""
+    return {"history": [], "summary": "", "window_start": 0}
+
+async def run_conversation_step(
     topic, 
     teacher_source, teacher_model, teacher_temp, teacher_top_p, teacher_prompt,
     student1_source, student1_model, student1_temp, student1_top_p, student1_prompt,
@@ -161,100 +501,149 @@ def run_conversation_step(
     max_turns,
     ollama_url,
     api_key,
-    current_messages
-):
+    use_cache,
+    context_window,
+    parallel_students,
+    pacing_ms,
+    current_messages,
+    session,
+    resume: bool = False
+) -> AsyncGenerator[Tuple[List[Dict[str, str]], Dict], None]:
     """
-    Generator function to run the conversation step-by-step.
-    Yields the updated list of messages for the Chatbot.
+    Async generator to run the conversation step-by-step.
+    Yields the updated list of messages for the Chatbot, together with the
+    session state (history, summary) after the last completed round; the turn
+    number is always len(history), so it can never disagree with it.
+    With resume, the conversation picks up from that state instead of turn 0,
+    so already-generated turns aren't paid for again.
+
+    Each LLM call is awaited, so a slow model never blocks the Gradio event
+    loop and several browser sessions can run conversations concurrently.
+    With parallel_students, both students reply to the same snapshot of the
+    conversation at the same time, so a round costs about one student's
+    latency instead of two.
     """
     
-    # Define participants
+    # Apply this run's UI settings to the default classroom
+    teacher, student1, student2 = PARTICIPANTS
     participants = [
-        {
-            "name": "Professor Maya", 
-            "role": "Teacher",
-            "source": teacher_source,
-            "model": teacher_model, 
-            "prompt": teacher_prompt, 
-            "config": {"temperature": teacher_temp, "top_p": teacher_top_p, "max_tokens": 150},
-            "avatar": "👩‍🏫" 
-        },
-        {
-            "name": "Curious George", 
-            "role": "Student",
-            "source": student1_source,
-            "model": student1_model, 
-            "prompt": student1_prompt, 
-            "config": {"temperature": student1_temp, "top_p": student1_top_p, "max_tokens": 100},
-            "avatar": "🐵"
-        },
-        {
-            "name": "Handson Alex", 
-            "role": "Student",
-            "source": student2_source,
-            "model": student2_model, 
-            "prompt": student2_prompt, 
-            "config": {"temperature": student2_temp, "top_p": student2_top_p, "max_tokens": 100},
-            "avatar": "🧑‍💻"
-        },
+        replace(teacher, source=teacher_source, model=teacher_model, temperature=teacher_temp, top_p=teacher_top_p, prompt=teacher_prompt),
+        replace(student1, source=student1_source, model=student1_model, temperature=student1_temp, top_p=student1_top_p, prompt=student1_prompt),
+        replace(student2, source=student2_source, model=student2_model, temperature=student2_temp, top_p=student2_top_p, prompt=student2_prompt),
     ]
     
-    messages = [] 
-    conversation_history_internal = []
+    # The per-turn instruction never changes during a conversation, so it is built once and
+    # the very same message is sent every turn
+    instructions = {p.name: instruction_message(p.name, topic, opening=False) for p in participants}
+    opening_message = instruction_message(participants[0].name, topic, opening=True)
+
+    if not resume or not session or not session["history"]:
+        session = new_session()
+    conversation_history_internal = session["history"]
+    summary = session["summary"]
+    window_start = session["window_start"] # Index of the oldest turn still sent verbatim
+    context_window = int(context_window)
+
+    # Redraw the completed turns; a reply that was cut off mid-stream is dropped and retaken
+    prefixes = {p.name: p.prefix for p in participants}
+    messages = [
+        {"role": "assistant", "content": prefixes[entry["name"]] + entry["content"]}
+        for entry in conversation_history_internal
+    ]
+    if resume:
+        yield messages, session
+
+    # Each participant's chat payload grows by one message per turn instead of being rebuilt
+    recent = conversation_history_internal[window_start:]
+    transcripts = {
+        p.name: build_transcript(p.name, p.prompt, recent, summary)
+        for p in participants
+    }
     
-    turn = 0
-    while turn < max_turns:
+    while len(conversation_history_internal) < max_turns:
+        turn = len(conversation_history_internal)
         participant = participants[turn % 3]
-        
-        # Prepare prompt
-        conversation_text = format_conversation_for_prompt(conversation_history_internal)
-        
-        if not conversation_history_internal:
-            user_prompt = f"""You are {participant['name']}.
-The topic to discuss is: {topic}
-
-Start the conversation by introducing the topic and asking an opening question."""
-        else:
-            user_prompt = f"""You are {participant['name']}.
-
-The conversation so far is:
-{conversation_text}
-
-Now respond with what you would like to say next, as {participant['name']}. Be natural and conversational."""
 
-        system_prompt = participant["prompt"]
+        # Once the window overflows, fold the oldest turns into the summary and keep half the
+        # window verbatim, so the transcripts are rebuilt only every few turns. Taking notes doesn't
+        # need the teacher's (usually biggest) model, so a student's writes them, as in main.py
+        if context_window and len(conversation_history_internal) - window_start > context_window:
+            fold_end = len(conversation_history_internal) - max(context_window // 2, 1)
+            note_taker = participants[1]
+            new_summary = await summarize_turns(
+                summary, conversation_history_internal[window_start:fold_end],
+                model=note_taker.model, source=note_taker.source, ollama_url=ollama_url, api_key=api_key, use_cache=use_cache
+            )
+            if new_summary is not None:
+                summary, window_start = new_summary, fold_end
+                session.update(summary=summary, window_start=window_start)
+                recent = conversation_history_internal[window_start:]
+                transcripts = {
+                    p.name: build_transcript(p.name, p.prompt, recent, summary)
+                    for p in participants
+                }
+
+        # With parallel students, both students answer the same teacher message at once
+        speakers = [participant]
+        if parallel_students and turn % 3 == 1 and turn + 1 < max_turns:
+            speakers.append(participants[2])
+
+        # Prepare prompts
+        opening = not conversation_history_internal
+        streams = [
+            stream_llm(
+                model=p.model,
+                messages=transcripts[p.name] + [opening_message if opening else instructions[p.name]],
+                config=p.config,
+                source=p.source,
+                ollama_url=ollama_url,
+                api_key=api_key,
+                use_cache=use_cache,
+                prompt_cache_key=f"tutor:{p.name}"
+            )
+            for p in speakers
+        ]
         
-        # Call LLM
-        response_text = call_llm(
-            model=participant["model"],
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            config=participant["config"],
-            source=participant["source"],
-            ollama_url=ollama_url,
-            api_key=api_key
-        )
-        
-        # Add to internal history
-        conversation_history_internal.append({
-            "name": participant["name"],
-            "content": response_text
-        })
-        
-        # Add to Chatbot messages
-        formatted_content = f"**{participant['name']}** {participant['avatar']}:\n\n{response_text}"
-        
-        messages.append({
-            "role": "assistant",
-            "content": formatted_content
-        })
-        
-        yield messages
+        # Show empty bubbles immediately, then fill them in as tokens arrive
+        first = len(messages)
+        for speaker in speakers:
+            messages.append({
+                "role": "assistant",
+                "content": speaker.prefix
+            })
+
+        response_texts = [""] * len(speakers)
+        yield messages, session
+        # Gradio diffs and re-renders the whole chat on every yield, so tokens are
+        # batched into at most one UI update per STREAM_UPDATE_INTERVAL
+        last_update = time.monotonic()
+        async for i, delta in merge_streams(streams):
+            response_texts[i] += delta
+            messages[first + i]["content"] = speakers[i].prefix + response_texts[i]
+            now = time.monotonic()
+            if now - last_update >= STREAM_UPDATE_INTERVAL:
+                last_update = now
+                yield messages, session
         
-        turn += 1
-        time.sleep(0.5) # Small delay for visual pacing
+        # Add to internal history, in speaking order regardless of which reply finished first
+        for speaker, response_text in zip(speakers, response_texts):
+            entry = {
+                "name": speaker.name,
+                "content": response_text
+            }
+            conversation_history_internal.append(entry)
+            for name, transcript in transcripts.items():
+                transcript.append(history_message(name, entry))
+        yield messages, session
+
+        # Optional breathing room between turns for readability; never blocks the event loop
+        if pacing_ms and len(conversation_history_internal) < max_turns:
+            await asyncio.sleep(pacing_ms / 1000)
+
+async def continue_conversation_step(*args):
+    """Resume the conversation kept in the session state, up to Max Turns in total"""
+    async for update in run_conversation_step(*args, resume=True):
+        yield update
 
 # ============================================================================
 # UI LAYOUT
@@ -274,45 +663,40 @@ with gr.Blocks(title="Multi-Agent Tutor Orchestrator") as demo:
             ollama_url_input = gr.Textbox(label="Ollama URL", value=DEFAULT_OLLAMA_URL)
             api_key_input = gr.Textbox(label="API Key (for OpenAI)", value=DEFAULT_API_KEY, type="password")
             max_turns_input = gr.Slider(label="Max Turns", minimum=1, maximum=50, value=MAX_TURNS_DEFAULT, step=1)
-
+            context_window_input = gr.Slider(label="Context Window (turns)", minimum=0, maximum=50, value=CONTEXT_WINDOW_DEFAULT, step=1, info="Older turns are summarized; 0 sends the full conversation")
+            pacing_input = gr.Slider(label="Pacing (ms)", minimum=0, maximum=1000, value=PACING_MS_DEFAULT, step=50, info="Pause between turns; replies already stream in, so 0 is usually fine")
+            parallel_students_input = gr.Checkbox(label="Students answer together", value=False, info="George and Alex reply to the same message in parallel; faster, but they don't hear each other's reply")
+            ollama_notice = gr.Markdown(visible=False)
+            use_cache_input = gr.Checkbox(label="Reuse cached responses", value=RESPONSE_CACHE_DEFAULT, info="Replay identical prompts from .cache/ instead of calling the model again")
+
+    # One panel per participant, built from the default classroom
+    panels = []
     with gr.Row():
-        # Teacher Panel
-        with gr.Column(variant="panel"):
-            gr.Markdown("### 👩‍🏫 Professor Maya (Teacher)")
-            teacher_source = gr.Dropdown(choices=["Ollama", "OpenAI API"], value="Ollama", label="Model Source")
-            # allow_custom_value=False to fix scrolling issues
-            teacher_model = gr.Dropdown(label="Model", value=TEACHER_MODEL_DEFAULT, choices=[TEACHER_MODEL_DEFAULT], allow_custom_value=False, interactive=True)
-            with gr.Row():
-                teacher_temp = gr.Slider(label="Temperature", minimum=0.0, maximum=2.0, value=TEACHER_CONFIG_DEFAULT["temperature"], step=0.1)
-                teacher_top_p = gr.Slider(label="Top P", minimum=0.0, maximum=1.0, value=TEACHER_CONFIG_DEFAULT["top_p"], step=0.05)
-            teacher_prompt = gr.Textbox(label="System Prompt", value=TEACHER_PROMPT_DEFAULT, lines=5)
-
-        # Student 1 Panel
-        with gr.Column(variant="panel"):
-            gr.Markdown("### 🐵 Curious George (Student 1)")
-            student1_source = gr.Dropdown(choices=["Ollama", "OpenAI API"], value="Ollama", label="Model Source")
-            student1_model = gr.Dropdown(label="Model", value=STUDENT1_MODEL_DEFAULT, choices=[STUDENT1_MODEL_DEFAULT], allow_custom_value=False, interactive=True)
-            with gr.Row():
-                student1_temp = gr.Slider(label="Temperature", minimum=0.0, maximum=2.0, value=STUDENT1_CONFIG_DEFAULT["temperature"], step=0.1)
-                student1_top_p = gr.Slider(label="Top P", minimum=0.0, maximum=1.0, value=STUDENT1_CONFIG_DEFAULT["top_p"], step=0.05)
-            student1_prompt = gr.Textbox(label="System Prompt", value=STUDENT1_PROMPT_DEFAULT, lines=5)
-
-        # Student 2 Panel
-        with gr.Column(variant="panel"):
-            gr.Markdown("### 🧑‍💻 Handson Alex (Student 2)")
-            student2_source = gr.Dropdown(choices=["Ollama", "OpenAI API"], value="Ollama", label="Model Source")
-            student2_model = gr.Dropdown(label="Model", value=STUDENT2_MODEL_DEFAULT, choices=[STUDENT2_MODEL_DEFAULT], allow_custom_value=False, interactive=True)
-            with gr.Row():
-                student2_temp = gr.Slider(label="Temperature", minimum=0.0, maximum=2.0, value=STUDENT2_CONFIG_DEFAULT["temperature"], step=0.1)
-                student2_top_p = gr.Slider(label="Top P", minimum=0.0, maximum=1.0, value=STUDENT2_CONFIG_DEFAULT["top_p"], step=0.05)
-            student2_prompt = gr.Textbox(label="System Prompt", value=STUDENT2_PROMPT_DEFAULT, lines=5)
+        for spec in PARTICIPANTS:
+            with gr.Column(variant="panel"):
+                gr.Markdown(f"### {spec.avatar} {spec.name} ({spec.title})")
+                source = gr.Dropdown(choices=["Ollama", "OpenAI API"], value=spec.source, label="Model Source")
+                # allow_custom_value=False to fix scrolling issues
+                model = gr.Dropdown(label="Model", value=spec.model, choices=[spec.model], allow_custom_value=False, interactive=True)
+                with gr.Row():
+                    temp = gr.Slider(label="Temperature", minimum=0.0, maximum=2.0, value=spec.temperature, step=0.1)
+                    top_p = gr.Slider(label="Top P", minimum=0.0, maximum=1.0, value=spec.top_p, step=0.05)
+                prompt = gr.Textbox(label="System Prompt", value=spec.prompt, lines=5)
+            panels.append((source, model, temp, top_p, prompt))
+
+    teacher_source, teacher_model, teacher_temp, teacher_top_p, teacher_prompt = panels[0]
+    student1_source, student1_model, student1_temp, student1_top_p, student1_prompt = panels[1]
+    student2_source, student2_model, student2_temp, student2_top_p, student2_prompt = panels[2]
 
     # The Stage
     gr.Markdown("### 🎭 The Stage")
+    warmup_status = gr.Markdown()
     chatbot = gr.Chatbot(height=600)
+    conversation_state = gr.State(new_session())
     
     with gr.Row():
         start_btn = gr.Button("▶️ Start Conversation", variant="primary")
+        continue_btn = gr.Button("⏩ Continue")
         clear_btn = gr.Button("🗑️ Clear")
 
     # Event Handlers
@@ -322,27 +706,51 @@ with gr.Blocks(title="Multi-Agent Tutor Orchestrator") as demo:
     student1_source.change(fn=update_model_dropdown, inputs=[student1_source, ollama_url_input], outputs=student1_model)
     student2_source.change(fn=update_model_dropdown, inputs=[student2_source, ollama_url_input], outputs=student2_model)
 
-    # Initial load of models
-    demo.load(fn=update_model_dropdown, inputs=[teacher_source, ollama_url_input], outputs=teacher_model)
-    demo.load(fn=update_model_dropdown, inputs=[student1_source, ollama_url_input], outputs=student1_model)
-    demo.load(fn=update_model_dropdown, inputs=[student2_source, ollama_url_input], outputs=student2_model)
-
-    start_btn.click(
-        fn=run_conversation_step,
-        inputs=[
-            topic_input,
-            teacher_source, teacher_model, teacher_temp, teacher_top_p, teacher_prompt,
-            student1_source, student1_model, student1_temp, student1_top_p, student1_prompt,
-            student2_source, student2_model, student2_temp, student2_top_p, student2_prompt,
-            max_turns_input,
-            ollama_url_input,
-            api_key_input,
-            chatbot
+    # Initial load of models, then preload the chosen Ollama models so the first turns don't pay for cold starts
+    demo.load(
+        fn=load_model_dropdowns,
+        inputs=[teacher_source, student1_source, student2_source, ollama_url_input],
+        outputs=[teacher_model, student1_model, student2_model]
+    ).then(
+        fn=warm_up_models,
+        inputs=[teacher_source, teacher_model, student1_source, student1_model, student2_source, student2_model, ollama_url_input],
+        outputs=warmup_status
+    )
+
+    # Explain Ollama's slot settings when the students are meant to run in parallel, and re-check
+    # whenever the students' models or the server change (the URL once it's done being edited)
+    gr.on(
+        triggers=[
+            parallel_students_input.change,
+            student1_source.change, student2_source.change,
+            student1_model.change, student2_model.change,
+            ollama_url_input.blur, ollama_url_input.submit,
         ],
-        outputs=chatbot
+        fn=check_ollama_parallelism,
+        inputs=[parallel_students_input, student1_source, student2_source, student1_model, student2_model, ollama_url_input],
+        outputs=ollama_notice
     )
+
+    conversation_inputs = [
+        topic_input,
+        teacher_source, teacher_model, teacher_temp, teacher_top_p, teacher_prompt,
+        student1_source, student1_model, student1_temp, student1_top_p, student1_prompt,
+        student2_source, student2_model, student2_temp, student2_top_p, student2_prompt,
+        max_turns_input,
+        ollama_url_input,
+        api_key_input,
+        use_cache_input,
+        context_window_input,
+        parallel_students_input,
+        pacing_input,
+        chatbot,
+        conversation_state
+    ]
+    start_btn.click(fn=run_conversation_step, inputs=conversation_inputs, outputs=[chatbot, conversation_state])
+    # Continue picks up from the last completed round; raise Max Turns to extend a finished lesson
+    continue_btn.click(fn=continue_conversation_step, inputs=conversation_inputs, outputs=[chatbot, conversation_state])
     
-    clear_btn.click(lambda: [], None, chatbot)
+    clear_btn.click(lambda: ([], new_session()), None, [chatbot, conversation_state])
 
 if __name__ == "__main__":
     demo.launch(theme=gr.themes.Soft(), allowed_paths=["."])
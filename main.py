@@ -3,20 +3,55 @@ Three-way conversation between Ollama models: Teacher and 2 Students
 A simple, self-contained program for learning about multi-model conversations
 """
 
-import json
-from typing import List, Dict
-from openai import OpenAI
+import argparse
+import asyncio
+import hashlib
+import httpx
+import itertools
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import orjson
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 # ============================================================================
 # CONFIGURATION - Edit these to match your Ollama models
 # ============================================================================
 
+OLLAMA_URL = "http://localhost:11434/v1"  # Ollama's OpenAI-compatible endpoint
+
+# Status messages (who's speaking, summaries, progress) go to stderr through logging,
+# so stdout is just the conversation itself
+log = logging.getLogger("conversation")
+
+# At most this many requests are in flight at once, so the server isn't flooded
+MAX_CONCURRENT_REQUESTS = 4
+request_slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
 # Initialize OpenAI client pointing to Ollama
-client = OpenAI(
-    base_url="http://localhost:11434/v1",  # Ollama's OpenAI-compatible endpoint
-    api_key="ollama"  # Required but unused by Ollama
+# The async client lets requests overlap instead of blocking the program while a model thinks.
+# Its connection pool keeps one open connection per concurrent request and reuses them every turn,
+# so requests don't wait on a new connection each time.
+client = AsyncOpenAI(
+    base_url=OLLAMA_URL,
+    api_key="ollama",  # Required but unused by Ollama
+    max_retries=5,  # Retries rate limits and server errors with exponential backoff
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_keepalive_connections=MAX_CONCURRENT_REQUESTS, keepalive_expiry=60.0)
+    ),
 )
 
+# Response cache - replays identical requests from disk instead of asking the model again.
+# Deterministic requests (temperature 0) are always cached; set LLM_CACHE=1 to cache everything,
+# e.g. for fast, repeatable replays while you work on the code. Shared with app.py.
+CACHE_ALL_RESPONSES = os.getenv("LLM_CACHE", "") == "1"
+RESPONSE_CACHE_PATH = os.path.join(".cache", "llm_responses.db")
+
 # Model names - using your available Ollama models
 TEACHER_MODEL = "llama3.2:latest"      # 3.2B - Biggest model (Teacher)
 STUDENT1_MODEL = "llama3.2:1b"         # 1.2B - Medium model (Student 1)
@@ -81,139 +116,450 @@ You learn by doing. When you see code, you want to try variations or ask what ha
 When Professor Maya shows code, ask questions like "What if I use numbers?" or share what you tried.
 Keep responses brief (2-3 sentences)."""
 
+@dataclass(slots=True)
+class Participant:
+    """One speaker in the conversation. The system message is built once and reused every turn."""
+    name: str
+    model: str
+    system_msg: Dict[str, str]
+    config: Dict
+
+
+# Participants in speaking order, with their configs
+PARTICIPANTS = [
+    Participant("Professor Maya", TEACHER_MODEL, {"role": "system", "content": TEACHER_PROMPT}, TEACHER_CONFIG),
+    Participant("Curious George", STUDENT1_MODEL, {"role": "system", "content": STUDENT1_PROMPT}, STUDENT1_CONFIG),
+    Participant("Handson Alex", STUDENT2_MODEL, {"role": "system", "content": STUDENT2_PROMPT}, STUDENT2_CONFIG),
+]
+
+# Model routing - a turn that only answers a short remark with no question in it (an "ok, thanks!")
+# doesn't need the participant's own model; it goes to ROUTER_MODEL instead, which is faster.
+# ROUTE_THRESHOLD is the length (in characters) below which the previous turn counts as short;
+# set ROUTE_THRESHOLD=0 to turn routing off, so every participant always uses their own model.
+ROUTER_MODEL = STUDENT2_MODEL
+ROUTE_THRESHOLD = int(os.getenv("ROUTE_THRESHOLD", "60"))
+
 # Conversation settings
 MAX_TURNS = 20  # Total number of exchanges (increased for proper lesson flow)
 INITIAL_TOPIC = "Let's start learning Python from the very beginning. Show us the first thing every programmer learns!"
 
+# Separator lines for the terminal output
+SEP_EQ = "=" * 60
+SEP_DASH = "-" * 60
+
+# Context budget - every turn re-sends the conversation so far, so long lessons get slower and slower.
+# Once the turns sent to the models grow past SUMMARY_THRESHOLD (estimated) tokens, the oldest ones
+# are folded into a short summary. The most recent SUMMARY_KEEP_TURNS turns are always kept word for word.
+# The full conversation is still saved to the log.
+# Before each request we also check that it will fit in the model's context window with room for the
+# reply (Ollama's default window is a few thousand tokens), and summarize first if it wouldn't.
+SUMMARY_THRESHOLD = 1500
+MODEL_CONTEXT_WINDOW = 4096
+MESSAGE_OVERHEAD = 4             # Tokens each chat message costs on top of its text (role, separators)
+SUMMARY_KEEP_TURNS = 6
+SUMMARY_MODEL = STUDENT1_MODEL   # Taking notes doesn't need the biggest model
+
+SUMMARY_CONFIG = {
+    "temperature": 0.3,    # Stick to what was actually said
+    "top_p": 0.8,
+    "top_k": 20,
+    "max_tokens": 200,     # Room for a few sentences of notes
+}
+
+SUMMARY_PROMPT = """Summarize this Python lesson so far in a few sentences.
+Keep the concepts and code examples that were covered and any open questions. Leave out small talk."""
+
 # ============================================================================
 # CORE FUNCTIONS
 # ============================================================================
 
-def call_ollama(model: str, messages: List[Dict[str, str]], config: Dict = None) -> str:
-    """Send a message to Ollama using OpenAI library with configurable parameters"""
+cache_db = None
+
+
+def get_cache_db() -> sqlite3.Connection:
+    """Open (and create if needed) the on-disk response cache"""
+    global cache_db
+    if cache_db is None:
+        os.makedirs(os.path.dirname(RESPONSE_CACHE_PATH), exist_ok=True)
+        cache_db = sqlite3.connect(RESPONSE_CACHE_PATH)
+        cache_db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+    return cache_db
+
+
+def response_cache_key(model: str, messages: List[Dict[str, str]], config: Dict) -> str:
+    """Hash everything that determines a response into a short, stable key"""
+    payload = orjson.dumps([OLLAMA_URL, model, messages, config], option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+async def call_ollama(model: str, messages: List[Dict[str, str]], config: Dict = None,
+                      on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Send a message to Ollama using OpenAI library with configurable parameters.
+    With on_token, the response is streamed and each piece of text is handed to
+    on_token as soon as it arrives (e.g. to print it), instead of waiting for the
+    whole answer. Either way the full response is returned at the end.
+    """
     if config is None:
         config = {"temperature": 0.7}  # Default fallback
     
+    # Same request as before? Answer from the cache
+    use_cache = CACHE_ALL_RESPONSES or config.get("temperature", 0.7) == 0
+    if use_cache:
+        key = response_cache_key(model, messages, config)
+        row = get_cache_db().execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            if on_token:
+                on_token(row[0])
+            return row[0]
+    
+    pieces = []  # Streamed text received so far
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=config.get("temperature", 0.7),
-            top_p=config.get("top_p", 0.9),
-            max_tokens=config.get("max_tokens", 150),
-            # Note: top_k not available in OpenAI API format, but some Ollama versions support it
-        )
-        return response.choices[0].message.content
+        async with request_slots:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=config.get("temperature", 0.7),
+                top_p=config.get("top_p", 0.9),
+                max_tokens=config.get("max_tokens", 150),
+                stream=on_token is not None,
+                # Note: top_k not available in OpenAI API format, but some Ollama versions support it
+            )
+            if on_token:
+                # Streaming - pass each piece along as it arrives and collect the full text
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        pieces.append(chunk.choices[0].delta.content)
+                        on_token(pieces[-1])
+                content = "".join(pieces)
+            else:
+                content = response.choices[0].message.content or ""  # Can be None, e.g. for an empty reply
     except Exception as e:
-        return f"[Error calling {model}: {e}]"
-
-
-
-def format_conversation(history: List[Dict[str, str]]) -> str:
-    """Format conversation history as a readable string"""
-    if not history:
-        return "No conversation yet."
+        error = f"[Error calling {model}: {e}]"  # Errors are never cached
+        if on_token:
+            # Show the error where the reply was streaming; if it broke off part-way, keep what
+            # already arrived, so the screen and the log show the same turn
+            if pieces:
+                error = " " + error
+            on_token(error)
+        return "".join(pieces) + error
     
-    lines = []
-    for entry in history:
-        lines.append(f"{entry['speaker']}: {entry['message']}")
-    return "\n\n".join(lines)
+    if use_cache:
+        get_cache_db().execute("INSERT OR REPLACE INTO responses (key, content) VALUES (?, ?)", (key, content))
+        get_cache_db().commit()
+    return content
+
 
 
-def get_next_response(model: str, system_prompt: str, speaker_name: str, 
-                      conversation_history: List[Dict[str, str]], config: Dict = None) -> str:
+def new_transcripts() -> Dict[str, List[Dict[str, str]]]:
     """
-    Get next response from a model using the reliable single-prompt pattern.
-    System prompt defines who they are, user prompt contains full conversation.
+    Start each participant's view of the conversation: just their system prompt.
+    Turns are appended as they happen (own turns as "assistant", everyone else's
+    as "user" with their name in front), so nothing is re-formatted and the
+    messages sent last turn are always an exact prefix of this turn's, which
+    lets the server reuse its prompt cache.
     """
-    conversation_text = format_conversation(conversation_history)
-    
-    if not conversation_history:
+    return {p.name: [p.system_msg] for p in PARTICIPANTS}
+
+
+def add_turn(transcripts: Dict[str, List[Dict[str, str]]], speaker_name: str, message: str):
+    """Append one finished turn to every participant's view of the conversation"""
+    from_someone_else = {"role": "user", "content": f"{speaker_name}: {message}"}
+    for name, transcript in transcripts.items():
+        if name == speaker_name:
+            transcript.append({"role": "assistant", "content": message})
+        else:
+            transcript.append(from_someone_else)
+
+
+def instruction_message(speaker_name: str, opening: bool) -> Dict[str, str]:
+    """The short instruction sent after the conversation so far"""
+    if opening:
         # First message - teacher starts the topic
-        user_prompt = f"""You are {speaker_name}.
+        instruction = f"""You are {speaker_name}.
 The topic to discuss is: {INITIAL_TOPIC}
 
 Start the conversation by introducing the topic and asking an opening question."""
     else:
-        # Subsequent messages - include full conversation context
-        user_prompt = f"""You are {speaker_name}.
+        # Subsequent messages - the conversation itself is already in the messages before this
+        instruction = f"You are {speaker_name}. Now respond with what you would like to say next, as {speaker_name}. Be natural and conversational."
+    return {"role": "user", "content": instruction}
+
+
+# Instructions only depend on the speaker and the topic, so each one is built once up front
+# and the exact same text is sent every turn
+INSTRUCTIONS = {
+    p.name: {
+        "opening": instruction_message(p.name, opening=True),
+        "next": instruction_message(p.name, opening=False),
+    }
+    for p in PARTICIPANTS
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count - about 4 characters per token for English text.
+    Each model has its own tokenizer, but a budget check only needs a ballpark.
+    """
+    return len(text) // 4 + 1
+
+
+def turn_tokens(entry: Dict[str, str]) -> int:
+    """Estimated tokens one turn adds to every request after it"""
+    return estimate_tokens(entry["message"]) + MESSAGE_OVERHEAD
+
+
+# The system prompt and instruction are the same every turn, so their size is estimated once up front
+PROMPT_TOKENS = {
+    p.name: estimate_tokens(p.system_msg["content"]) + estimate_tokens(INSTRUCTIONS[p.name]["next"]["content"])
+            + 2 * MESSAGE_OVERHEAD
+    for p in PARTICIPANTS
+}
+
+
+def over_budget(participant: Participant, context_tokens: int) -> bool:
+    """
+    Pre-flight check before asking a participant: has the conversation grown past
+    SUMMARY_THRESHOLD, or would the request plus the longest possible reply not fit
+    in the model's context window?
+    """
+    if context_tokens > SUMMARY_THRESHOLD:
+        return True
+    reply_tokens = participant.config.get("max_tokens", 150)
+    return PROMPT_TOKENS[participant.name] + context_tokens + reply_tokens > MODEL_CONTEXT_WINDOW
+
+
+def build_transcripts(context: List[Dict[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+    """Rebuild every participant's view from scratch, e.g. after older turns were summarized"""
+    transcripts = new_transcripts()
+    for entry in context:
+        add_turn(transcripts, entry["speaker"], entry["message"])
+    return transcripts
+
+
+async def compact_context(context: List[Dict[str, str]]) -> Optional[List[Dict[str, str]]]:
+    """
+    Shrink the turns sent to the models once they're over budget.
+    Everything but the most recent turns is summarized into a single SYSTEM entry.
+    Returns the new, shorter context, or None if there's nothing old enough to
+    summarize (or the summary failed - then we just carry on).
+    """
+    if len(context) <= SUMMARY_KEEP_TURNS:
+        return None
+    
+    older, recent = context[:-SUMMARY_KEEP_TURNS], context[-SUMMARY_KEEP_TURNS:]
+    lesson = "\n\n".join(f"{entry['speaker']}: {entry['message']}" for entry in older)
+    summary = await call_ollama(SUMMARY_MODEL, [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": lesson},
+    ], SUMMARY_CONFIG)
+    if summary.startswith("[Error calling"):
+        return None
+    
+    return [{"speaker": "SYSTEM", "message": f"Summary so far: {summary.strip()}"}] + recent
+
+
+def route_model(model: str, transcript: List[Dict[str, str]], opening: bool) -> str:
+    """Pick the model for this turn - ROUTER_MODEL if the turn being answered is just a short remark"""
+    if opening or len(transcript) < 2:
+        return model
+    last_turn = transcript[-1]["content"]
+    if transcript[-1]["role"] == "user":
+        last_turn = last_turn.split(": ", 1)[-1]  # Just what they said, without the "Name: " in front
+    if len(last_turn) < ROUTE_THRESHOLD and "?" not in last_turn:
+        return ROUTER_MODEL
+    return model
+
+
+async def get_next_response(model: str, speaker_name: str, transcript: List[Dict[str, str]],
+                            opening: bool, config: Dict = None,
+                            on_token: Optional[Callable[[str], None]] = None) -> Tuple[str, str]:
+    """
+    Get next response from a model.
+    The transcript holds their system prompt and every past turn as separate chat messages.
+    Returns the response together with the model that actually wrote it (see route_model).
+    """
+    instruction = INSTRUCTIONS[speaker_name]["opening" if opening else "next"]
+    routed = route_model(model, transcript, opening)
+    if routed != model:
+        log.info(f"{speaker_name} is answering a short remark, so {routed} replies instead of {model}")
+    return await call_ollama(routed, transcript + [instruction], config, on_token), routed
 
-The conversation so far is:
-{conversation_text}
 
-Now respond with what you would like to say next, as {speaker_name}. Be natural and conversational."""
+def show_token(text: str):
+    """Print a piece of a streamed response right away"""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+async def conversation_turns() -> AsyncIterator[Dict[str, str]]:
+    """
+    The conversation itself - simple sequential turn-taking.
+    Shows each turn live as it streams in and yields it ({"speaker": ..., "message": ...})
+    once it's finished, so the caller decides what to do with it (save it, print it, ...).
+    """
     
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt}
-    ]
+    # The turns still sent to the models, and each participant's view of those
+    context = []
+    context_tokens = 0
+    transcripts = new_transcripts()
     
-    return call_ollama(model, messages, config)
+    # Simple conversation loop - everyone takes turns in order
+    # Who speaks each turn? Rotate through: Maya, George, Alex, Maya, George, Alex...
+    speakers = itertools.islice(itertools.cycle(PARTICIPANTS), MAX_TURNS)
+    for turn, participant in enumerate(speakers):
+        
+        # Getting long? Fold the oldest turns into a summary first
+        if over_budget(participant, context_tokens):
+            compacted = await compact_context(context)
+            if compacted is not None:
+                log.info("Summarized older turns to keep the context small")
+                context = compacted
+                context_tokens = sum(turn_tokens(entry) for entry in context)
+                transcripts = build_transcripts(context)
+        
+        # Display - the header goes out in one write, then the response word by word as it streams in
+        log.info(f"{participant.name} is speaking...")
+        sys.stdout.write(f"\n{SEP_EQ}\n{participant.name.upper()}:\n{SEP_DASH}\n")
+        sys.stdout.flush()
+        
+        # Get their response
+        response, model = await get_next_response(
+            model=participant.model,
+            speaker_name=participant.name,
+            transcript=transcripts[participant.name],
+            opening=turn == 0,
+            config=participant.config,
+            on_token=show_token
+        )
+        sys.stdout.write("\n")
+        
+        # Add to the conversation so far
+        entry = {
+            "speaker": participant.name,
+            "model": model,
+            "message": response
+        }
+        context.append(entry)
+        context_tokens += turn_tokens(entry)
+        add_turn(transcripts, participant.name, response)
+        
+        yield entry
+
+
+def write_log(path: str, entries: queue.Queue):
+    """Background writer: appends each queued turn to a JSON Lines file until it gets None"""
+    with open(path, "wb") as f:
+        while (entry := entries.get()) is not None:
+            f.write(orjson.dumps(entry) + b"\n")
+            f.flush()
 
 
-def run_conversation():
-    """Main conversation loop - simple sequential turn-taking"""
+async def run_conversation():
+    """Run one conversation, saving every turn as it happens"""
     
-    # Initialize conversation history (shared context stored here)
+    # Initialize conversation history (kept for the log)
     conversation_history = []
     
-    # Define participants with their configs
-    participants = [
-        {"name": "Professor Maya", "model": TEACHER_MODEL, "prompt": TEACHER_PROMPT, "config": TEACHER_CONFIG},
-        {"name": "Curious George", "model": STUDENT1_MODEL, "prompt": STUDENT1_PROMPT, "config": STUDENT1_CONFIG},
-        {"name": "Handson Alex", "model": STUDENT2_MODEL, "prompt": STUDENT2_PROMPT, "config": STUDENT2_CONFIG},
-    ]
-    
     # Start the conversation
-    print("\n" + "="*60)
+    print("\n" + SEP_EQ)
     print("THREE-WAY CONVERSATION: PROFESSOR MAYA, CURIOUS GEORGE & HANDSON ALEX")
-    print("="*60)
+    print(SEP_EQ)
     print(f"\nTopic: {INITIAL_TOPIC}")
     print(f"Models: Professor Maya={TEACHER_MODEL}, Curious George={STUDENT1_MODEL}, Handson Alex={STUDENT2_MODEL}")
+    if ROUTE_THRESHOLD:
+        print(f"Replies to short remarks (under {ROUTE_THRESHOLD} characters, no question): {ROUTER_MODEL}")
     print(f"Max turns: {MAX_TURNS}")
-    print("\n" + "="*60)
+    print("\n" + SEP_EQ)
     
-    # Simple conversation loop - everyone takes turns in order
-    turn = 0
-    while turn < MAX_TURNS:
-        # Who speaks this turn? Rotate through: 0, 1, 2, 0, 1, 2...
-        participant = participants[turn % 3]
-        
-        print(f"\n[{participant['name']} is speaking...]")
+    # Every turn is written to a JSON Lines log right away, so nothing is lost if the run stops early.
+    # A background thread does the writing, so the next request doesn't wait on the disk
+    log_queue = queue.Queue()
+    log_writer = threading.Thread(target=write_log, args=("conversation_log.jsonl", log_queue))
+    log_writer.start()
+    try:
+        async for entry in conversation_turns():
+            conversation_history.append(entry)
+            log_queue.put(entry)
+    finally:
+        # Save conversation to file - also when interrupted, with the turns so far
+        log_queue.put(None)  # Tells the writer we're done
+        log_writer.join()
+        with open("conversation_log.json", "wb") as f:
+            f.write(orjson.dumps(conversation_history, option=orjson.OPT_INDENT_2))
+    
+    print("\n" + SEP_EQ)
+    print("CONVERSATION COMPLETE")
+    print(SEP_EQ)
+    
+    print("\nConversation saved to: conversation_log.json (and turn by turn to conversation_log.jsonl)")
+    print(f"Total exchanges: {len(conversation_history)}")
+
+
+async def run_conversation_batch(n_conversations: int):
+    """
+    Run several independent conversations side by side, e.g. to generate many
+    transcripts at once. Every turn, the next speaker of all conversations is
+    asked at the same time, so the batch takes about as long as a single
+    conversation instead of N of them (up to MAX_CONCURRENT_REQUESTS at a time).
+    """
+    
+    # One history per conversation - they share nothing but the settings
+    histories = [[] for _ in range(n_conversations)]
+    contexts = [[] for _ in range(n_conversations)]
+    contexts_tokens = [0] * n_conversations
+    all_transcripts = [new_transcripts() for _ in range(n_conversations)]
+    
+    print("\n" + SEP_EQ)
+    print(f"BATCH: {n_conversations} CONVERSATIONS SIDE BY SIDE")
+    print(SEP_EQ)
+    print(f"\nTopic: {INITIAL_TOPIC}")
+    if ROUTE_THRESHOLD:
+        print(f"Replies to short remarks (under {ROUTE_THRESHOLD} characters, no question): {ROUTER_MODEL}")
+    print(f"Max turns: {MAX_TURNS}")
+    
+    speakers = itertools.islice(itertools.cycle(PARTICIPANTS), MAX_TURNS)
+    for turn, participant in enumerate(speakers):
         
-        # Get their response
-        response = get_next_response(
-            model=participant["model"],
-            system_prompt=participant["prompt"],
-            speaker_name=participant["name"],
-            conversation_history=conversation_history,
-            config=participant["config"]
-        )
+        # Summarize wherever a conversation has grown past the budget (all at once, too)
+        due = [i for i in range(n_conversations) if over_budget(participant, contexts_tokens[i])]
+        compacted = await asyncio.gather(*(compact_context(contexts[i]) for i in due))
+        for i, new_context in zip(due, compacted):
+            if new_context is not None:
+                contexts[i] = new_context
+                contexts_tokens[i] = sum(turn_tokens(entry) for entry in new_context)
+                all_transcripts[i] = build_transcripts(new_context)
         
-        # Add to shared conversation history
-        conversation_history.append({
-            "speaker": participant["name"],
-            "message": response
-        })
+        # Ask this turn's speaker in every conversation at once
+        responses = await asyncio.gather(*(
+            get_next_response(
+                model=participant.model,
+                speaker_name=participant.name,
+                transcript=transcripts[participant.name],
+                opening=turn == 0,
+                config=participant.config
+            )
+            for transcripts in all_transcripts
+        ))
         
-        # Display
-        print(f"\n{'='*60}")
-        print(f"{participant['name'].upper()}:")
-        print(f"{'-'*60}")
-        print(response)
+        for i, (response, model) in enumerate(responses):
+            entry = {
+                "speaker": participant.name,
+                "model": model,
+                "message": response
+            }
+            histories[i].append(entry)
+            contexts[i].append(entry)
+            contexts_tokens[i] += turn_tokens(entry)
+            add_turn(all_transcripts[i], participant.name, response)
         
-        turn += 1
-    
-    # Save conversation to file
-    print("\n" + "="*60)
-    print("CONVERSATION COMPLETE")
-    print("="*60)
+        log.info(f"Turn {turn + 1}/{MAX_TURNS}: {participant.name} answered in all {n_conversations} conversations")
     
-    with open("conversation_log.json", "w", encoding="utf-8") as f:
-        json.dump(conversation_history, f, indent=2, ensure_ascii=False)
+    with open("conversation_log_batch.json", "wb") as f:
+        f.write(orjson.dumps(histories, option=orjson.OPT_INDENT_2))
     
-    print("\nConversation saved to: conversation_log.json")
-    print(f"Total exchanges: {len(conversation_history)}")
+    print("\nConversations saved to: conversation_log_batch.json")
 
 
 # ============================================================================
@@ -221,15 +567,27 @@ def run_conversation():
 # ============================================================================
 
 def main():
-    print("\nStarting Ollama conversation...")
-    print("Make sure Ollama is running (ollama serve)")
+    parser = argparse.ArgumentParser(description="Three-way conversation between Ollama models")
+    parser.add_argument("--batch", type=int, metavar="N",
+                        help="run N independent conversations side by side and save them to conversation_log_batch.json")
+    args = parser.parse_args()
+    
+    logging.basicConfig(format="[%(asctime)s] %(message)s", datefmt="%H:%M:%S", stream=sys.stderr)
+    log.setLevel(logging.INFO)  # Just our messages - not every HTTP request the libraries make
+    log.info("Starting Ollama conversation...")
+    log.info("Make sure Ollama is running (ollama serve)")
     
     try:
-        run_conversation()
+        if args.batch:
+            asyncio.run(run_conversation_batch(args.batch))
+        else:
+            asyncio.run(run_conversation())
     except KeyboardInterrupt:
-        print("\n\nConversation interrupted by user.")
+        log.warning("Conversation interrupted by user.")
+        if not args.batch:
+            log.warning("The turns so far are saved in conversation_log.json")
     except Exception as e:
-        print(f"\n\nError: {e}")
+        log.error(f"Error: {e}")
 
 
 if __name__ == "__main__":